@@ -3,13 +3,28 @@ import os
 import click
 import sys
 import csv
+import functools
 import time
+import numpy as np
 import pandas as pd
 import country_converter as coco
 import hashlib
+import itertools
+import multiprocessing
 import phonenumbers
+import pyarrow as pa
+from click.core import ParameterSource
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pyarrow import csv as pa_csv
 from tqdm import tqdm
-from uszipcode import SearchEngine
+from typing import BinaryIO, Callable, Iterator, Tuple
+from uszipcode import SearchEngine, SimpleZipcode, ZipcodeTypeEnum
+
+try:
+    import blake3
+except ImportError:
+    blake3 = None
 
 HEADER_TRANSLATIONS = {
     "email1": "Email",
@@ -17,12 +32,29 @@ HEADER_TRANSLATIONS = {
     "person_country": "Country",
 }
 
-REQUIRED_HEADERS = {"First Name", "Last Name", "Phone", "Email", "Country", "Zip"}
-OPTIONAL_HEADERS = set()  # TODO: Add optional headers that can be uploaded.
+REQUIRED_HEADERS = frozenset(
+    {"First Name", "Last Name", "Phone", "Email", "Country", "Zip"}
+)
+OPTIONAL_HEADERS = frozenset()  # TODO: Add optional headers that can be uploaded.
 
 # All headers that can be in a Customer Match CSV.
 ALL_HEADERS = REQUIRED_HEADERS.union(OPTIONAL_HEADERS)
+# Delimiters detected from the header of a CSV without sniffing it.
+DELIMITERS = (",", ";", "\t", "|")
+# Translation table to turn snake case field names into space separated words.
+UNDERSCORE_TO_SPACE = str.maketrans("_", " ")
 DO_NOT_HASH = {"Country", "Zip"}
+# Dataframes with fewer rows than this are hashed in-process, since spawning
+# worker processes would cost more than the hashing itself.
+PARALLEL_HASH_MIN_ROWS = 10000
+# Number of rows written to the output CSV at a time, to bound memory use.
+CSV_CHUNKSIZE = 100000
+# Number of bytes of the input CSV read and processed at a time.
+CSV_BLOCK_SIZE = 64 * 1024 * 1024
+# Shown when blake3 hashing is asked for without the optional package installed.
+BLAKE3_MISSING_MESSAGE = (
+    "The blake3 package is required to hash with BLAKE3. Install it with: pip install blake3"
+)
 
 # ANSI codes to color/format terminal prints.
 ANSI = {
@@ -80,44 +112,78 @@ def check_path(filepath: str):
         raise ValueError(f"The path {path} does not exist.")
 
 
-def check_csv(filepath: str) -> csv.Dialect:
-    """Runs checks on a CSV file, such as whether it exists and if it can be parsed, and returns
-        its dialect object
+def check_csv(filepath: str):
+    """Checks that a CSV file exists and is a file. Whether it can be parsed is checked
+        when its dialect is sniffed, with sniff_dialect
 
     Args:
         filepath (str): Path to the CSV file
 
     Raises:
-        ValueError: If the path does not exist, or the file cannot be read as a CSV
-
-    Returns:
-        csv.Dialect: Parsed CSV dialect from the file
+        ValueError: If the path does not exist, or is not a file
     """
-    # Check that the file exists, and is a file.
     basename = os.path.basename(filepath)
     if not os.path.exists(filepath):
         raise ValueError(f"The path {filepath} does not exist.")
     if not os.path.isfile(filepath):
         raise ValueError(f"{basename} is not a file.")
 
-    # Try to open the file and verify it can be read as a CSV.
+
+@functools.lru_cache(maxsize=None)
+def delimited_dialect(delimiter: str) -> type:
+    """Makes the excel CSV dialect with another delimiter.
+
+    Args:
+        delimiter (str): The delimiter between fields
+
+    Returns:
+        type: A csv.excel subclass using the delimiter
+    """
+
+    class DelimitedDialect(csv.excel):
+        pass
+
+    DelimitedDialect.delimiter = delimiter
+    return DelimitedDialect
+
+
+def sniff_dialect(file: BinaryIO) -> csv.Dialect:
+    """Sniffs the dialect of an open CSV file, and rewinds the file so it can be read again.
+
+    Args:
+        file (BinaryIO): The CSV file, opened in binary mode
+
+    Raises:
+        ValueError: If the file cannot be read as a CSV
+
+    Returns:
+        csv.Dialect: Parsed CSV dialect from the file
+    """
+    # Fast path: if exactly one of the usual delimiters is in the header,
+    # use it without sniffing a sample of the file.
+    header = file.readline()
+    file.seek(0)
+    found = [delimiter for delimiter in DELIMITERS if delimiter.encode() in header]
+    if len(found) == 1:
+        return delimited_dialect(found[0])
+
     try:
-        file = open(filepath, encoding="utf8")
-        dialect = csv.Sniffer().sniff(file.read(100000))
+        # The sample may end partway through a multibyte character.
+        sample = file.read(100000).decode("utf8", errors="ignore")
+        dialect = csv.Sniffer().sniff(sample)
         file.seek(0)
-        file.close()
         return dialect
     except csv.Error as e:
         raise ValueError(
-            f"Could not get a CSV dialect for file {basename}. Is it a CSV file? Is it maybe too large?"
+            f"Could not get a CSV dialect for file {os.path.basename(file.name)}. Is it a CSV file? Is it maybe too large?"
         )
 
 
-def parse_google_fields(filepath: str, ignore_zip: bool = False) -> dict:
+def parse_google_fields(field_names: list, ignore_zip: bool = False) -> dict:
     """Parse the header of the CSV to get the Google field names.
 
     Args:
-        filepath (str): Path to the CSV file.
+        field_names (list): The field names in the header of the CSV file.
         ignore_zip (bool): Flag to ignore the zip code column, and not throw an error if it is missing.
 
     Raises:
@@ -129,31 +195,29 @@ def parse_google_fields(filepath: str, ignore_zip: bool = False) -> dict:
     """
     field_map = {}
     found_headers = []
-    with open(filepath, "r", encoding="utf8") as file:
-        reader = csv.DictReader(file)
-        field_names = reader.fieldnames
-
-        # For each field in the header column, try to translate
-        # them to a header recognized by Google.
-        for field in field_names:
-            header = None
-            # Check if there is a direct translation first:
-            if field in HEADER_TRANSLATIONS:
-                header = HEADER_TRANSLATIONS[field]
-            # Otherwise attempt to translate snake case:
-            elif (translated_field := field.replace("_", " ").title()) in ALL_HEADERS:
-                header = translated_field
-
-            # If we have not found this header yet, add it to the map.
-            # Otherwise, if we have found the header already, warn the user.
-            if header is not None and header not in found_headers:
-                notify(f"Detected header name '{header}' as '{field}' in CSV file")
-                field_map[field] = header
-                found_headers.append(header)
-            elif header in found_headers:
-                warn(
-                    f"Duplicate header name '{header}' was extracted as '{field}'. Keeping column with header '{field_map[header]}'"
-                )
+    # For each field in the header column, try to translate
+    # them to a header recognized by Google.
+    for field in field_names:
+        header = None
+        # Check if there is a direct translation first:
+        if field in HEADER_TRANSLATIONS:
+            header = HEADER_TRANSLATIONS[field]
+        # Otherwise attempt to translate snake case:
+        elif (
+            translated_field := field.translate(UNDERSCORE_TO_SPACE).title()
+        ) in ALL_HEADERS:
+            header = translated_field
+
+        # If we have not found this header yet, add it to the map.
+        # Otherwise, if we have found the header already, warn the user.
+        if header is not None and header not in found_headers:
+            notify(f"Detected header name '{header}' as '{field}' in CSV file")
+            field_map[field] = header
+            found_headers.append(header)
+        elif header in found_headers:
+            warn(
+                f"Duplicate header name '{header}' was extracted as '{field}'. Keeping column with header '{field_map[header]}'"
+            )
     # Check if we have all required headers.
     # All required headers are found if the required headers set is a subset of the headers found.
     if not REQUIRED_HEADERS.issubset(field_map.values()):
@@ -168,11 +232,11 @@ def parse_google_fields(filepath: str, ignore_zip: bool = False) -> dict:
     return field_map
 
 
-def parse_location_fields(filepath: str) -> dict:
+def parse_location_fields(field_names: list) -> dict:
     """Parse a header of a CSV file to get the country and city.
 
     Args:
-        filepath (str): Path to the CSV file
+        field_names (list): The field names in the header of the CSV file.
 
     Raises:
         FormatError: If the city, country or both columns cannot be found.
@@ -184,20 +248,16 @@ def parse_location_fields(filepath: str) -> dict:
     WANTED_FIELDS = {"state", "city"}
     found_translations = []
     field_map = {}
-    with open(filepath, "r", encoding="utf8") as file:
-        reader = csv.DictReader(file)
-        field_names = reader.fieldnames
-
-        for field in field_names:
-            # Salesql CSVs prefix state and city by person_.
-            field = field.lower()
-            salesql_field = field.replace("person_", "")
-            possible_fields = {field, salesql_field}
-            if found_set := WANTED_FIELDS.intersection(possible_fields):
-                translation = list(found_set)[0]
-                notify(f"Detected header name '{translation}' as '{field}' in CSV file")
-                found_translations.append(translation)
-                field_map[field] = translation
+    for field in field_names:
+        # Salesql CSVs prefix state and city by person_.
+        field = field.lower()
+        salesql_field = field.replace("person_", "")
+        possible_fields = {field, salesql_field}
+        if found_set := WANTED_FIELDS.intersection(possible_fields):
+            translation = list(found_set)[0]
+            notify(f"Detected header name '{translation}' as '{field}' in CSV file")
+            found_translations.append(translation)
+            field_map[field] = translation
 
     if not WANTED_FIELDS.issubset(field_map.values()):
         missing_fields = WANTED_FIELDS.difference(field_map.values())
@@ -207,72 +267,222 @@ def parse_location_fields(filepath: str) -> dict:
     return field_map
 
 
-def hash_element(element: any) -> str:
-    """Produces a sha256 hash of an element of data.
+def sha256_hex_batch(elements: list) -> list:
+    """Produces the sha256 hex digests of a batch of bytes in one call.
+
+    Args:
+        elements (list): The bytes to be hashed
+
+    Returns:
+        list: The sha256 hash hex digest of each element, in order
+    """
+    # Bind sha256 locally and hash in a single comprehension. hashlib is backed
+    # by OpenSSL, which already uses the CPU's SHA extensions when present.
+    sha256 = hashlib.sha256
+    return [sha256(element).hexdigest() for element in elements]
+
+
+def blake3_hex_batch(elements: list) -> list:
+    """Produces the BLAKE3 hex digests of a batch of bytes in one call.
 
     Args:
-        element (any): The data to be hashed
+        elements (list): The bytes to be hashed
 
     Returns:
-        str: The sha256 hash hex digest
+        list: The 256 bit BLAKE3 hash hex digest of each element, in order
     """
-    element = str(element).encode("utf-8")
-    return hashlib.sha256(element).hexdigest()
+    # bytes.hex is faster than the blake3 package's own hexdigest.
+    hasher = blake3.blake3
+    return [hasher(element).digest().hex() for element in elements]
 
 
-def hash_series(series: pd.Series):
+# Batch hash functions for each algorithm that can be selected with --hash-alg.
+HASH_ALGORITHMS = {
+    "sha256": sha256_hex_batch,
+    "blake3": blake3_hex_batch,
+}
+
+
+def hash_series(
+    series: pd.Series, fast: bool = False, algorithm: str = "sha256"
+) -> pd.Series:
     """Hashes a series, usually represnting columns in a CSV.
 
     Args:
-        series (pd.Series): [description]
+        series (pd.Series): The series to be hashed
+        fast (bool): Use pandas' non-cryptographic 64 bit hash instead of sha256.
+        algorithm (str): The name of the algorithm in HASH_ALGORITHMS to hash with.
 
     Returns:
-        [type]: [description]
+        pd.Series: The same series with all elements hashed, unless it is
+                    a column that shouldn't be hashed.
     """
     # If the name of the series is a field
     # that shouldn't be hashed (eg: Zip), don't hash it.
     if series.name in DO_NOT_HASH:
         return series
-    else:
-        return series.map(hash_element)
+
+    if fast:
+        # Customer lists have few duplicate values, so skip factorizing them first.
+        # Hashes are the same either way.
+        hashed = pd.util.hash_pandas_object(series, index=False, categorize=False)
+        # Format every 64 bit hash as 16 hex characters in one pass, by viewing
+        # the hex of the big-endian bytes as fixed width strings.
+        hex_digests = np.array(hashed.values.astype(">u8").tobytes().hex())
+        hex_digests = hex_digests.reshape(1).view("U16") if len(hashed) else []
+        return pd.Series(
+            hex_digests, index=series.index, name=series.name, dtype=object
+        )
+
+    encoded = [str(value).encode("utf-8") for value in series.values]
+    hashed = HASH_ALGORITHMS[algorithm](encoded)
+    return pd.Series(hashed, index=series.index, name=series.name)
+
+
+def hash_workers(columns: int) -> int:
+    """Gets the number of worker processes to hash columns in.
+
+    Args:
+        columns (int): The number of columns that will be hashed at once.
+
+    Returns:
+        int: One worker for each column, up to the CPU count. Below two, hashing in
+                worker processes only adds overhead, so columns are hashed in-process.
+    """
+    return min(os.cpu_count() or 1, columns)
+
+
+def make_hash_executor(columns: int) -> ProcessPoolExecutor:
+    """Makes a process pool to hash the columns of a dataframe in.
+
+    Args:
+        columns (int): The number of columns that will be hashed at once.
+
+    Returns:
+        ProcessPoolExecutor: A pool with a worker for each column, up to the CPU count.
+    """
+    # Forking a process with running threads (Arrow's readers, the CSV writer)
+    # can deadlock, so start workers from a clean server process where possible.
+    methods = multiprocessing.get_all_start_methods()
+    method = "forkserver" if "forkserver" in methods else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=max(1, hash_workers(columns)),
+        mp_context=multiprocessing.get_context(method),
+    )
 
 
-def hash_dataframe(dataframe: pd.DataFrame) -> pd.DataFrame:
+def hash_dataframe(
+    dataframe: pd.DataFrame,
+    fast: bool = False,
+    algorithm: str = "sha256",
+    executor: ProcessPoolExecutor = None,
+) -> pd.DataFrame:
     """Hashes all elements in a Pandas dataframe.
 
     Args:
         dataframe (pd.DataFrame): The dataframe to be hashed
+        fast (bool): Use pandas' non-cryptographic 64 bit hash instead of sha256.
+                        The result is not accepted by Google Customer Match.
+        algorithm (str): The name of the algorithm in HASH_ALGORITHMS to hash with.
+                            Only sha256 is accepted by Google Customer Match.
+        executor (ProcessPoolExecutor): The pool to hash large dataframes in, from
+                                        make_hash_executor. A new one is made if not given.
+
+    Raises:
+        ValueError: If the algorithm is blake3 and the blake3 package is not installed
 
     Returns:
         pd.DataFrame: The dataframe with all elements hashed
     """
+    if algorithm == "blake3" and blake3 is None:
+        raise ValueError(BLAKE3_MISSING_MESSAGE)
     notify(f"Hashing {dataframe.size} elements...")
     start = time.time()
-    dataframe = dataframe.apply(hash_series, axis=0)
+    # Only send the columns that are hashed to the workers.
+    to_hash = [column for column in dataframe.columns if column not in DO_NOT_HASH]
+    columns = [dataframe[column] for column in to_hash]
+    # Columns are hashed independently, so hash each in its own process.
+    if len(dataframe.index) < PARALLEL_HASH_MIN_ROWS or hash_workers(len(columns)) < 2:
+        hashed = [hash_series(column, fast, algorithm) for column in columns]
+    else:
+        # Only shut the pool down afterwards if it was made here.
+        pool = nullcontext(executor) if executor else make_hash_executor(len(columns))
+        with pool as executor:
+            hashed = list(
+                executor.map(
+                    hash_series,
+                    columns,
+                    itertools.repeat(fast),
+                    itertools.repeat(algorithm),
+                )
+            )
+    dataframe = dataframe.copy()
+    for column, series in zip(to_hash, hashed):
+        dataframe[column] = series
     notify(
         f"Finished hashing {dataframe.size} elements in {time.time() - start} seconds."
     )
     return dataframe
 
 
-def get_dataframe(filepath: str) -> pd.DataFrame:
-    """Gets a dataframe for a given CSV file.
+def read_header(filepath: str) -> Tuple[csv.Dialect, list]:
+    """Reads the dialect and the header of a CSV file, without reading the rest of it.
 
     Args:
         filepath (str): Path to the CSV file.
 
+    Raises:
+        ValueError: If the path does not exist, or the file cannot be read as a CSV
+
     Returns:
-        pd.DataFrame: [description]
+        Tuple[csv.Dialect, list]: The dialect of the CSV file, and the field names in its header.
     """
-    dialect = check_csv(filepath)
-    return pd.read_csv(
+    check_csv(filepath)
+    with open(filepath, "rb") as file:
+        dialect = sniff_dialect(file)
+        field_names = next(csv.reader([file.readline().decode("utf8")], dialect))
+    return dialect, field_names
+
+
+def get_dataframes(
+    filepath: str, dialect: csv.Dialect, columns: list
+) -> Iterator[pd.DataFrame]:
+    """Gets dataframes for consecutive chunks of a given CSV file, with only the given columns.
+
+    Args:
+        filepath (str): Path to the CSV file.
+        dialect (csv.Dialect): The dialect of the CSV file, from read_header.
+        columns (list): The field names of the columns to read.
+
+    Yields:
+        pd.DataFrame: A chunk of the CSV file, with every column read as strings.
+                        At least one, possibly empty, chunk is always yielded.
+    """
+    # Stream with Arrow's CSV reader, which reads ahead on background threads
+    # while the previous chunk is processed, and skip the columns that aren't
+    # needed. Every column is read as a string, so values such as zip codes
+    # keep their leading zeros.
+    reader = pa_csv.open_csv(
         filepath,
-        warn_bad_lines=False,
-        error_bad_lines=False,
-        sep=dialect.delimiter,
-        low_memory=False,
-        dtype=str,
+        read_options=pa_csv.ReadOptions(block_size=CSV_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=dialect.delimiter,
+            # Quoted values, such as notes or addresses, may span multiple lines.
+            newlines_in_values=True,
+            invalid_row_handler=lambda row: "skip",
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={column: pa.string() for column in columns},
+            include_columns=columns,
+            strings_can_be_null=True,
+        ),
     )
+    empty = True
+    for batch in reader:
+        empty = False
+        yield batch.to_pandas()
+    if empty:
+        yield reader.schema.empty_table().to_pandas()
 
 
 def translate_dataframe(dataframe: pd.DataFrame, field_map: dict) -> pd.DataFrame:
@@ -295,52 +505,127 @@ def translate_dataframe(dataframe: pd.DataFrame, field_map: dict) -> pd.DataFram
     return dataframe
 
 
-def save_csv(dataframe: pd.DataFrame, output: str):
+def save_csv(dataframe: pd.DataFrame, output: str, append: bool = False):
     """Saves a dataframe to a CSV file.
 
     Args:
         dataframe (pd.DataFrame): The dataframe to be saved
         output (str): The filepath to be saved to
+        append (bool): Append the rows to the file, without a header, instead of
+                        overwriting it.
     """
-    dataframe.to_csv(output, index=False, encoding="utf-8")
-    notify(f"Succesfully saved Customer Match data file to {os.path.abspath(output)}.")
+    dataframe.to_csv(
+        output,
+        mode="a" if append else "w",
+        header=not append,
+        index=False,
+        encoding="utf-8",
+        chunksize=CSV_CHUNKSIZE,
+    )
+
+
+def load_zip_map(search: SearchEngine) -> dict:
+    """Loads the zipcode database into memory as a map from city and state to zip code.
+        Like SearchEngine.by_city_and_state, only standard zip codes are included, and
+        the lowest zip code is kept for cities with more than one.
+
+    Args:
+        search (SearchEngine): The search engine object to load the zipcodes from.
+
+    Returns:
+        dict: A map from the lowercase city and two letter state to the zip code.
+                eg: ("hoboken", "NJ"): "07030"
+    """
+    rows = (
+        search.ses.query(
+            SimpleZipcode.major_city, SimpleZipcode.state, SimpleZipcode.zipcode
+        )
+        .filter(SimpleZipcode.zipcode_type == ZipcodeTypeEnum.Standard.value)
+        .order_by(SimpleZipcode.zipcode)
+    )
+    zip_map = {}
+    for city, state, zipcode in rows:
+        zip_map.setdefault((city.lower(), state), zipcode)
+    return zip_map
 
 
-def get_zip(row: pd.Series, search: SearchEngine) -> str:
-    """Get the zip code for a row in a dataframe with the city and state.
+def make_zip_lookup(search: SearchEngine) -> Callable[[str, str], str]:
+    """Makes a function that looks up the zip code for a city and state. Exact matches
+        are found in an in-memory map of the zipcode database, and anything else falls
+        back to the search engine's fuzzy matching. Lookups are cached, so each city
+        and state pair is only searched for once.
 
     Args:
-        row (pd.Series): A series containing a city and state field.
         search (SearchEngine): The search engine object to lookup the zipcode.
 
     Returns:
-        str: The zipcode if found. None otherwise.
+        Callable[[str, str], str]: A function taking a city and state, and returning
+                                    the zipcode if found. An empty string otherwise.
     """
-    try:
-        if row.count() == 2:
-            res = search.by_city_and_state(city=row["city"], state=row["state"])
+
+    zip_map = load_zip_map(search)
+
+    @functools.lru_cache(maxsize=None)
+    def lookup(city: str, state: str) -> str:
+        if zipcode := zip_map.get((city.strip().lower(), state.strip().upper())):
+            return zipcode
+        try:
+            res = search.by_city_and_state(city=city, state=state)
             return res[0].zipcode
-        else:
-            warn(f"NaN detected for {row['city']}, {row['state']}.")
+        except (AttributeError, IndexError):
+            warn(f"Zip lookup for {city}, {state} failed.")
             return ""
-    except (AttributeError, IndexError):
-        warn(f"Zip lookup for {row['city']}, {row['state']} failed.")
+
+    return lookup
+
+
+def get_zip(city: str, state: str, lookup: Callable[[str, str], str]) -> str:
+    """Get the zip code for a city and state.
+
+    Args:
+        city (str): The city to lookup.
+        state (str): The state the city is in.
+        lookup (Callable[[str, str], str]): The zipcode lookup, from make_zip_lookup.
+
+    Returns:
+        str: The zipcode if found. An empty string otherwise.
+    """
+    if pd.isna(city) or pd.isna(state):
+        warn(f"NaN detected for {city}, {state}.")
         return ""
+    return lookup(city, state)
 
 
-def get_zips(dataframe: pd.DataFrame) -> pd.Series:
+def get_zips(
+    dataframe: pd.DataFrame, lookup: Callable[[str, str], str] = None
+) -> pd.Series:
     """Gets the zips for a dataframe with city and state columns.
 
     Args:
         dataframe (pd.DataFrame): The dataframe, must have city and state columns.
+        lookup (Callable[[str, str], str]): The zipcode lookup, from make_zip_lookup.
+                                            A new one is made if not given.
 
     Returns:
         pd.Series: A series of zip codes correlating to the zips for each city and state.
     """
-    search = SearchEngine()
-    tqdm.pandas(desc="Getting zipcodes")
-    zips = dataframe.progress_apply(lambda row: get_zip(row, search), axis=1)
-    zips = zips.rename("Zip")
+    if lookup is None:
+        lookup = make_zip_lookup(SearchEngine())
+    # Lookup each unique city and state once, then join the zips back onto every row.
+    locations = dataframe[["city", "state"]]
+    unique = locations.drop_duplicates()
+    unique = unique.assign(
+        Zip=[
+            get_zip(city, state, lookup)
+            for city, state in tqdm(
+                zip(unique["city"], unique["state"]),
+                total=len(unique.index),
+                desc="Getting zipcodes",
+            )
+        ]
+    )
+    zips = locations.merge(unique, on=["city", "state"], how="left")["Zip"]
+    zips.index = dataframe.index
     return zips
 
 
@@ -356,7 +641,7 @@ def convert_to_iso(dataframe: pd.DataFrame) -> pd.DataFrame:
     notify(f"Converting {len(dataframe.index)} countries to ISO2 format...")
     start = time.time()
     iso2_names = coco.convert(names=dataframe["Country"], to="ISO2", not_found=None)
-    dataframe["Country"] = pd.Series(iso2_names)
+    dataframe["Country"] = pd.Series(iso2_names, index=dataframe.index, dtype=object)
     notify(
         f"Finished converting countries to ISO2 format in {time.time() - start} seconds."
     )
@@ -381,32 +666,31 @@ def normalize_series(column: pd.Series) -> pd.Series:
     return column.map(format)
 
 
-def get_e164(row: pd.Series) -> str:
-    """Takes a series containing a Phone and Country column and returns the
-        phone number in E.164 format.
-
+def get_e164(phone: str, country: str) -> str:
+    """Takes a phone number and its country and returns the phone number in E.164 format.
 
     Args:
-        row (pd.Series): A series containing at least a Phone and Country column.
+        phone (str): The phone number.
+        country (str): The country of the phone number, in ISO2 format.
 
     Returns:
         str: The phone number in E.164 format, if it could be formatted.
                 None otherwise.
     """
-    if row.count() == 2:
+    if not (pd.isna(phone) or pd.isna(country)):
         try:
-            number = phonenumbers.parse(row["Phone"], row["Country"])
+            number = phonenumbers.parse(phone, country)
             return phonenumbers.format_number(
                 number, phonenumbers.PhoneNumberFormat.E164
             )
         except phonenumbers.NumberParseException:
             warn(
-                f"Can't parse phone number {row['Phone']} for country {row['Country']}. It is not recognized as a valid number."
+                f"Can't parse phone number {phone} for country {country}. It is not recognized as a valid number."
             )
             return None
     else:
         # warn(
-        #     f"Can't convert phone number {row['Phone']} for country {row['Country']} due to missing data."
+        #     f"Can't convert phone number {phone} for country {country} due to missing data."
         # )
         return None
 
@@ -420,9 +704,17 @@ def convert_to_e164(dataframe: pd.DataFrame) -> pd.DataFrame:
     Returns:
         pd.DataFrame: The same dataframe with the Phone column reformatted to E.164.
     """
-    tqdm.pandas(desc="Converting phone numbers to E.164 format")
-    numbers = dataframe[["Country", "Phone"]].progress_apply(get_e164, axis=1)
-    dataframe["Phone"] = numbers
+    # Loop over the raw values instead of applying over rows,
+    # which would build a Series for every row.
+    numbers = [
+        get_e164(phone, country)
+        for phone, country in tqdm(
+            zip(dataframe["Phone"].values, dataframe["Country"].values),
+            total=len(dataframe.index),
+            desc="Converting phone numbers to E.164 format",
+        )
+    ]
+    dataframe["Phone"] = pd.Series(numbers, index=dataframe.index, dtype=object)
     return dataframe
 
 
@@ -463,6 +755,74 @@ def prune(dataframe: pd.DataFrame) -> pd.DataFrame:
     return dataframe
 
 
+def process_dataframe(
+    dataframe: pd.DataFrame,
+    do_hash: bool,
+    hash_alg: str,
+    fast_hash: bool,
+    ignore_empty: bool,
+    format: bool,
+    executor: ProcessPoolExecutor = None,
+) -> pd.DataFrame:
+    """Prunes, formats and hashes a translated dataframe, as selected by the command line options.
+
+    Args:
+        dataframe (pd.DataFrame): A dataframe translated to Google's field names
+        do_hash (bool): Hash the dataframe with hash_alg
+        hash_alg (str): The name of the algorithm in HASH_ALGORITHMS to hash with
+        fast_hash (bool): Hash the dataframe with pandas' non-cryptographic hash
+        ignore_empty (bool): Keep rows with empty values
+        format (bool): Format the dataframe as it would be before hashing
+        executor (ProcessPoolExecutor): The pool to hash large dataframes in, from
+                                        make_hash_executor
+
+    Returns:
+        pd.DataFrame: The dataframe, ready to be saved
+    """
+    if not ignore_empty:
+        dataframe = prune(dataframe)
+
+    # Format the file for hashing if we are going to hash.
+    # Country codes are converted to ISO as a step in hashing, so
+    # we only have to convert if we are not hashing.
+    if do_hash or fast_hash or format:
+        dataframe = format_for_hashing(dataframe)
+    else:
+        dataframe = convert_to_iso(dataframe)
+
+    # Check again for empty values, if phone numbers can't be formatted
+    # or ISO formats can't be found.
+    if not ignore_empty:
+        dataframe = prune(dataframe)
+
+    # Hashing must be the last step, or else NaN will be hashed.
+    if do_hash or fast_hash:
+        dataframe = hash_dataframe(
+            dataframe, fast=fast_hash, algorithm=hash_alg, executor=executor
+        )
+    return dataframe
+
+
+def check_hash_alg(ctx: click.Context, param: click.Parameter, value: str) -> str:
+    """Click callback that checks the package for the chosen hash algorithm is installed,
+        so a missing package is reported before the file is read.
+
+    Args:
+        ctx (click.Context): The click context
+        param (click.Parameter): The --hash-alg option
+        value (str): The name of the chosen algorithm
+
+    Raises:
+        click.BadParameter: If blake3 is chosen and the blake3 package is not installed
+
+    Returns:
+        str: The name of the chosen algorithm
+    """
+    if value == "blake3" and blake3 is None:
+        raise click.BadParameter(BLAKE3_MISSING_MESSAGE)
+    return value
+
+
 @click.command(
     help="Generates a Google Ads Customer Match compliant CSV file from a (potentially large) CSV file in another format."
 )
@@ -473,6 +833,19 @@ def prune(dataframe: pd.DataFrame) -> pd.DataFrame:
     help="SHA256 hash each element in the resulting CSV.",
     is_flag=True,
 )
+@click.option(
+    "--hash-alg",
+    "hash_alg",
+    type=click.Choice(list(HASH_ALGORITHMS)),
+    default="sha256",
+    callback=check_hash_alg,
+    help="Algorithm to hash with when using --hash. Only sha256 is accepted by Google, blake3 requires the blake3 package.",
+)
+@click.option(
+    "--fast-hash",
+    help="Hash each element with a fast non-cryptographic 64 bit hash instead of SHA256. Not accepted by Google, for internal use only.",
+    is_flag=True,
+)
 @click.option(
     "--ignore-empty",
     help="Don't remove rows with empty elements.",
@@ -485,16 +858,29 @@ def prune(dataframe: pd.DataFrame) -> pd.DataFrame:
 )
 @click.argument("filepath")
 def main(
-    filepath: str, output: str, do_hash: bool, ignore_empty: bool, format: bool
+    filepath: str,
+    output: str,
+    do_hash: bool,
+    hash_alg: str,
+    fast_hash: bool,
+    ignore_empty: bool,
+    format: bool,
 ):
+    # --fast-hash isn't accepted by Google, so don't let it silently
+    # replace a sha256 hash that was asked for.
+    hash_alg_source = click.get_current_context().get_parameter_source("hash_alg")
+    if fast_hash and (do_hash or hash_alg_source == ParameterSource.COMMANDLINE):
+        raise click.UsageError("--fast-hash can't be used with --hash or --hash-alg.")
+    # Otherwise --hash-alg alone would write the PII out in plaintext.
+    if not do_hash and not fast_hash and hash_alg_source == ParameterSource.COMMANDLINE:
+        raise click.UsageError("--hash-alg can only be used with --hash.")
     try:
-        file = None
+        location_map = {}
         # Attempt to translate to Google's standard.
         try:
             check_path(output)
-            file = get_dataframe(filepath)
-            field_map = parse_google_fields(filepath)
-            file = translate_dataframe(file, field_map)
+            dialect, field_names = read_header(filepath)
+            field_map = parse_google_fields(field_names)
         # If the no zip is found, it is possible to lookup zip
         # codes. Ask the user if they want to try.
         except NoZipError:
@@ -502,36 +888,61 @@ def main(
                 "A zip code column could not be found in the CSV file. If there is a state and city column, the zip codes may be able to be automatically detected. This may take hours, depending on your file size."
             )
             if click.confirm("Would you like to try to detect zip codes?"):
-                field_map = parse_location_fields(filepath)
-                states_and_cities = translate_dataframe(file, field_map)
-                zip_codes = get_zips(states_and_cities)
-                field_map = parse_google_fields(filepath, ignore_zip=True)
-                translated = translate_dataframe(file, field_map)
-                file = pd.concat([translated, zip_codes], axis=1)
+                location_map = parse_location_fields(field_names)
+                field_map = parse_google_fields(field_names, ignore_zip=True)
             else:
                 sys.exit()
-
-        if not ignore_empty:
-            file = prune(file)
-
-        # Format the file for hashing if we are going to hash.
-        # Country codes are converted to ISO as a step in hashing, so
-        # we only have to convert if we are not hashing.
-        if do_hash or format:
-            file = format_for_hashing(file)
-        else:
-            file = convert_to_iso(file)
-
-        # Check again for empty values, if phone numbers can't be formatted
-        # or ISO formats can't be found.
-        if not ignore_empty:
-            file = prune(file)
-
-        # Hashing must be the last step, or else NaN will be hashed.
-        if do_hash:
-            file = hash_dataframe(file)
-
-        save_csv(file, output)
+        # Share one zip lookup between chunks, so the zipcode database
+        # is only loaded once.
+        lookup = make_zip_lookup(SearchEngine()) if location_map else None
+
+        # Share one hashing pool between chunks.
+        hashed_columns = set(field_map.values()).difference(DO_NOT_HASH)
+        executor = None
+        if (do_hash or fast_hash) and hash_workers(len(hashed_columns)) > 1:
+            executor = make_hash_executor(len(hashed_columns))
+
+        # Write to a temporary file next to the output, and only replace the
+        # output once every chunk is written, so a failure part way through
+        # never leaves a truncated CSV behind.
+        output_dir, output_name = os.path.split(os.path.abspath(output))
+        temp_output = os.path.join(output_dir, f".{output_name}.{os.getpid()}.tmp")
+        try:
+            # Process the file one chunk at a time, writing each finished chunk
+            # on a background thread while the next one is processed.
+            columns = list({**field_map, **location_map})
+            with ThreadPoolExecutor(max_workers=1) as writer:
+                written = None
+                for file in get_dataframes(filepath, dialect, columns):
+                    translated = translate_dataframe(file, field_map)
+                    if location_map:
+                        states_and_cities = translate_dataframe(file, location_map)
+                        zip_codes = get_zips(states_and_cities, lookup)
+                        translated = pd.concat([translated, zip_codes], axis=1)
+                    file = process_dataframe(
+                        translated,
+                        do_hash,
+                        hash_alg,
+                        fast_hash,
+                        ignore_empty,
+                        format,
+                        executor,
+                    )
+                    # Wait for the previous chunk, so at most one is held for writing.
+                    append = written is not None
+                    if append:
+                        written.result()
+                    written = writer.submit(save_csv, file, temp_output, append)
+                written.result()
+            os.replace(temp_output, output)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if os.path.exists(temp_output):
+                os.remove(temp_output)
+        notify(
+            f"Succesfully saved Customer Match data file to {os.path.abspath(output)}."
+        )
         return 0
     except ValueError as e:
         sys.exit(f"{ANSI['BOLD'] + ANSI['RED']}ERROR:{ANSI['RESET']} {e}")
@@ -6,10 +6,11 @@ with open("DESCRIPTION.txt") as file:
 REQUIREMENTS = [
     "click",
     "pandas",
-    "uszipcode",
+    "uszipcode>=1.0",
     "tqdm",
     "phonenumbers",
     "country_converter",
+    "pyarrow>=7",
 ]
 
 # some more details
@@ -33,6 +34,7 @@ setup(
     },
     classifiers=CLASSIFIERS,
     install_requires=REQUIREMENTS,
+    extras_require={"blake3": ["blake3"]},
     keywords="google customer match csv",
     zip_safe = False
 )
@@ -0,0 +1,33 @@
+import pandas as pd
+from customer_match import cli
+
+
+def test_get_dataframes_multiline_values_across_blocks(tmp_path, monkeypatch):
+    """Quoted values spanning multiple lines are parsed when the file is read in many blocks."""
+    rows = ["first_name,last_name,email,zip,country,phone,notes"]
+    for i in range(20000):
+        rows.append(
+            f'Name{i},Last{i},u{i}@x.com,0{i % 9999:04d},United States,+1 201-555-{i % 10000:04d},"line one {i}\nline two, with comma"'
+        )
+    filepath = tmp_path / "multiline.csv"
+    filepath.write_text("\n".join(rows) + "\n", encoding="utf8")
+    monkeypatch.setattr(cli, "CSV_BLOCK_SIZE", 64 * 1024)
+
+    dialect, field_names = cli.read_header(str(filepath))
+    chunks = list(cli.get_dataframes(str(filepath), dialect, field_names))
+
+    assert len(chunks) > 1
+    assert sum(len(chunk.index) for chunk in chunks) == 20000
+    assert chunks[-1]["notes"].iloc[-1] == "line one 19999\nline two, with comma"
+    assert chunks[-1]["zip"].iloc[-1] == "00001"
+
+
+def test_convert_to_iso_keeps_rows_aligned_with_non_contiguous_index():
+    """Each row keeps its own ISO2 country when the index doesn't start at zero."""
+    dataframe = pd.DataFrame(
+        {"Country": ["Germany", "United States", "France"]}, index=[5, 2, 9]
+    )
+
+    result = cli.convert_to_iso(dataframe)
+
+    assert result["Country"].to_dict() == {5: "DE", 2: "US", 9: "FR"}